@@ -8,6 +8,11 @@ from utils.data_processor import (
     daily_sales_trend,
     find_peak_sales_day,
     low_performing_products,
+    build_time_index,
+    rolling_averages,
+    period_rollup,
+    find_peak_sales_window,
+    MAX_INDEX_DAYS,
     generate_sales_report
 )
 from utils.api_handler import (
@@ -64,11 +69,30 @@ def main():
         region_wise_sales(valid_txns)
         top_selling_products(valid_txns)
         customer_analysis(valid_txns)
-        daily_sales_trend(valid_txns)
-        find_peak_sales_day(valid_txns)
         low_performing_products(valid_txns)
+
+        try:
+            time_index = build_time_index(valid_txns, MAX_INDEX_DAYS)
+        except ValueError as e:
+            print("⚠ Skipping time-based metrics:", e)
+            time_index = None
+
+        daily_sales_trend(valid_txns, time_index)
+        find_peak_sales_day(valid_txns, time_index)
         print("✓ Analysis complete")
 
+        if time_index and time_index["days"]:
+            last_date, avg_7 = next(reversed(rolling_averages(time_index, 7).items()))
+            avg_30 = rolling_averages(time_index, 30)[last_date]
+            print(f"7-day avg revenue (to {last_date}): ₹{avg_7['revenue']:,.0f}")
+            print(f"30-day avg revenue (to {last_date}): ₹{avg_30['revenue']:,.0f}")
+
+            start, end, revenue, count = find_peak_sales_window(time_index, 7)
+            print(f"Peak 7-day window: {start} to {end} | ₹{revenue:,.0f} | {count} transactions")
+
+            for month, totals in period_rollup(time_index, "month").items():
+                print(f"{month} | Revenue: ₹{totals['revenue']:,.0f} | Transactions: {totals['transaction_count']}")
+
         print("\n[6/10] Fetching product data from API...")
         products = fetch_all_products()
         product_map = create_product_mapping(products)
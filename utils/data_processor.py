@@ -1,6 +1,11 @@
 # utils/data_processor.py
 import os
-from datetime import datetime
+import math
+import heapq
+import hashlib
+import pickle
+import tempfile
+from datetime import datetime, date as date_cls
 from collections import defaultdict
 
 
@@ -44,7 +49,16 @@ def region_wise_sales(transactions):
 # --------------------------------------------------
 # Task 2.1(c): Top Selling Products
 # --------------------------------------------------
-def top_selling_products(transactions, n=5):
+def top_selling_products(transactions, n=5, memory_budget=None, spill_dir=None):
+    """
+    Top n products by quantity: [(product, qty, revenue)].
+    With memory_budget set, aggregates with spill-to-disk holding at most
+    memory_budget products in memory; revenue is then exactly rounded and
+    can differ from the default running sum in the last digits
+    """
+    if memory_budget is not None:
+        return _external_top_selling_products(transactions, n, memory_budget, spill_dir)
+
     product_data = defaultdict(lambda: {"qty": 0, "revenue": 0})
 
     for txn in transactions:
@@ -67,7 +81,18 @@ def top_selling_products(transactions, n=5):
 # --------------------------------------------------
 # Task 2.1(d): Customer Purchase Analysis
 # --------------------------------------------------
-def customer_analysis(transactions):
+def customer_analysis(transactions, memory_budget=None, spill_dir=None):
+    """
+    Per-customer spend, average order value and products, highest spend first.
+    With memory_budget set, the per-customer aggregation spills to disk and
+    holds at most memory_budget customers in memory, but the returned dict
+    still has one row per customer. total_spent is then exactly rounded
+    and can differ from the default running sum in the last digits, so
+    near-tied customers may swap places
+    """
+    if memory_budget is not None:
+        return _external_customer_analysis(transactions, memory_budget, spill_dir)
+
     customer_data = defaultdict(lambda: {"total_spent": 0, "orders": 0, "products": set()})
 
     for txn in transactions:
@@ -93,30 +118,194 @@ def customer_analysis(transactions):
     return result
 
 
+# --------------------------------------------------
+# Task 2.1(e): External Aggregation (spill to disk)
+# --------------------------------------------------
+SPILL_PARTITIONS = 16
+
+
+def _exact_add(partials, x):
+    """
+    Adds x to a list of non-overlapping float partials (the running sum
+    math.fsum keeps), so spilled totals do not depend on merge order.
+    Read the total with math.fsum(partials)
+    """
+    i = 0
+    for y in partials:
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo:
+            partials[i] = lo
+            i += 1
+        x = hi
+    partials[i:] = [x]
+
+
+def _partition_of(key, level, partitions):
+    # Salted per level so a partition that is re-split spreads its keys out
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8,
+                             salt=level.to_bytes(8, "little")).digest()
+    return int.from_bytes(digest, "little") % partitions
+
+
+def _read_spill(f):
+    f.seek(0)
+    while True:
+        try:
+            chunk = pickle.load(f)
+        except EOFError:
+            return
+        yield from chunk
+
+
+def _bounded_merge(records, combine, memory_budget, spill_dir=None, level=0,
+                   partitions=SPILL_PARTITIONS):
+    """
+    Merges (key, state) records holding at most `memory_budget` distinct
+    keys in memory. On overflow the partial states are hash-partitioned
+    into temporary files (removed once closed), and each partition is merged the same way one at
+    a time, re-split with a new hash salt if it is still over budget.
+    Yields: (key, state) pairs, each key exactly once
+    """
+    states = {}
+    spill_files = []
+
+    def spill():
+        if not spill_files:
+            for _ in range(partitions):
+                spill_files.append(tempfile.TemporaryFile(dir=spill_dir))
+
+        buckets = defaultdict(list)
+        for key, state in states.items():
+            buckets[_partition_of(key, level, partitions)].append((key, state))
+        for i, chunk in buckets.items():
+            pickle.dump(chunk, spill_files[i])
+        states.clear()
+
+    try:
+        for key, state in records:
+            if key in states:
+                combine(states[key], state)
+                continue
+            if len(states) >= memory_budget:
+                spill()
+            states[key] = state
+
+        if not spill_files:
+            # Everything fit within the budget
+            yield from states.items()
+            return
+
+        spill()
+        for f in spill_files:
+            yield from _bounded_merge(_read_spill(f), combine, memory_budget,
+                                      spill_dir, level + 1, partitions)
+            f.close()
+    finally:
+        for f in spill_files:
+            f.close()
+
+
+def _external_aggregate(transactions, key_field, new_state, update, combine,
+                        memory_budget, spill_dir=None):
+    """
+    Aggregates transactions by `key_field` holding at most `memory_budget`
+    distinct keys in memory, during ingest and during the merge
+    Yields: (key, state) pairs
+    """
+    if memory_budget < 1:
+        raise ValueError("memory_budget must be at least 1")
+
+    def records():
+        for seq, txn in enumerate(transactions):
+            state = new_state(seq)
+            update(state, txn)
+            yield txn[key_field], state
+
+    yield from _bounded_merge(records(), combine, memory_budget, spill_dir)
+
+
+def _external_top_selling_products(transactions, n, memory_budget, spill_dir=None):
+    def new_state(seq):
+        return {"qty": 0, "revenue": [], "first": seq}
+
+    def update(state, txn):
+        state["qty"] += txn["Quantity"]
+        _exact_add(state["revenue"], txn["Quantity"] * txn["UnitPrice"])
+
+    def combine(state, other):
+        state["qty"] += other["qty"]
+        for partial in other["revenue"]:
+            _exact_add(state["revenue"], partial)
+        state["first"] = min(state["first"], other["first"])
+
+    # "first" breaks ties in order of first appearance, like the stable
+    # in-memory sort does
+    top = heapq.nsmallest(
+        n,
+        _external_aggregate(transactions, "ProductName", new_state, update, combine,
+                            memory_budget, spill_dir),
+        key=lambda x: (-x[1]["qty"], x[1]["first"])
+    )
+
+    return [(product, data["qty"], math.fsum(data["revenue"])) for product, data in top]
+
+
+def _external_customer_analysis(transactions, memory_budget, spill_dir=None):
+    def new_state(seq):
+        return {"total_spent": [], "orders": 0, "products": set(), "first": seq}
+
+    def update(state, txn):
+        _exact_add(state["total_spent"], txn["Quantity"] * txn["UnitPrice"])
+        state["orders"] += 1
+        state["products"].add(txn["ProductName"])
+
+    def combine(state, other):
+        for partial in other["total_spent"]:
+            _exact_add(state["total_spent"], partial)
+        state["orders"] += other["orders"]
+        state["products"] |= other["products"]
+        state["first"] = min(state["first"], other["first"])
+
+    # The budget bounds the aggregation state only: the finished rows (and
+    # the returned dict) are still one entry per customer
+    rows = []
+    for cid, data in _external_aggregate(transactions, "CustomerID", new_state, update,
+                                         combine, memory_budget, spill_dir):
+        total = math.fsum(data["total_spent"])
+        rows.append((cid, data["first"], {
+            "total_spent": total,
+            "avg_order_value": round(total / data["orders"], 2),
+            "products_bought": list(data["products"])
+        }))
+    rows.sort(key=lambda x: (-x[2]["total_spent"], x[1]))
+
+    return {cid: data for cid, _, data in rows}
+
+
 # --------------------------------------------------
 # Task 2.2(a): Daily Sales Trend
 # --------------------------------------------------
-def daily_sales_trend(transactions):
-    daily_data = defaultdict(lambda: {
-        "revenue": 0,
-        "transaction_count": 0,
-        "customers": set()
-    })
+def daily_sales_trend(transactions, index=None):
+    """
+    Daily revenue, transaction count and unique customers in date order.
+    Pass a prebuilt time index to reuse its per-day totals
+    """
+    if index is None:
+        index = build_time_index(transactions)
 
+    customers = defaultdict(set)
     for txn in transactions:
-        date = txn["Date"]
-        revenue = txn["Quantity"] * txn["UnitPrice"]
-
-        daily_data[date]["revenue"] += revenue
-        daily_data[date]["transaction_count"] += 1
-        daily_data[date]["customers"].add(txn["CustomerID"])
+        customers[txn["Date"]].add(txn["CustomerID"])
 
     result = {}
-    for date in sorted(daily_data.keys(), key=lambda x: datetime.strptime(x, "%Y-%m-%d")):
+    for date, i in sorted(index["offsets"].items(), key=lambda x: x[1]):
         result[date] = {
-            "revenue": daily_data[date]["revenue"],
-            "transaction_count": daily_data[date]["transaction_count"],
-            "unique_customers": len(daily_data[date]["customers"])
+            "revenue": index["revenue"][i],
+            "transaction_count": index["transactions"][i],
+            "unique_customers": len(customers[date])
         }
 
     return result
@@ -125,20 +314,206 @@ def daily_sales_trend(transactions):
 # --------------------------------------------------
 # Task 2.2(b): Peak Sales Day
 # --------------------------------------------------
-def find_peak_sales_day(transactions):
-    daily = defaultdict(lambda: {"revenue": 0, "count": 0})
+def find_peak_sales_day(transactions, index=None):
+    """
+    Finds the day with the highest revenue; ties go to the date seen
+    first in the input. When a prebuilt time index is passed it is used
+    on its own and `transactions` is not read
+    Returns: (date, revenue, transaction_count) or None for no transactions
+    """
+    if index is None:
+        index = build_time_index(transactions)
+
+    if not index["days"]:
+        return None
+
+    # offsets are in first-appearance order, and max() keeps the first tie
+    peak_date, peak_offset = max(
+        index["offsets"].items(),
+        key=lambda x: index["revenue"][x[1]]
+    )
+
+    return peak_date, index["revenue"][peak_offset], index["transactions"][peak_offset]
+
+
+# --------------------------------------------------
+# Task 2.2(c): Time Index (prefix sums over day ordinals)
+# --------------------------------------------------
+def _date_ordinals(dates):
+    """
+    Parses each distinct date string once
+    Returns: dict {date_string: day_ordinal}
+    """
+    return {d: datetime.strptime(d, "%Y-%m-%d").toordinal() for d in set(dates)}
+
+
+def _offset_to_date(index, offset):
+    return date_cls.fromordinal(index["start"] + offset).isoformat()
+
 
+MAX_INDEX_DAYS = 3660
+
+
+def build_time_index(transactions, max_days=None):
+    """
+    Builds dense per-day arrays (revenue, transaction count, quantity)
+    from the first to the last sale date, plus cumulative prefix sums
+    so any date-range total costs O(1). "offsets" maps each date string
+    to its day offset, in order of first appearance.
+    If `max_days` is given (e.g. MAX_INDEX_DAYS), raises ValueError when
+    the dates span more days than that, which usually means a mistyped date
+    Returns: dict with start/end ordinals, per-day arrays and prefix sums
+    """
+    ordinals = _date_ordinals(txn["Date"] for txn in transactions)
+
+    if not ordinals:
+        start = end = None
+        days = 0
+    else:
+        start = min(ordinals.values())
+        end = max(ordinals.values())
+        days = end - start + 1
+
+    if max_days is not None and days > max_days:
+        raise ValueError(
+            f"Sales dates span {days} days "
+            f"({date_cls.fromordinal(start)} to {date_cls.fromordinal(end)}), "
+            f"more than the {max_days}-day limit; check for mistyped dates"
+        )
+
+    revenue = [0] * days
+    count = [0] * days
+    quantity = [0] * days
+
+    offsets = {}
     for txn in transactions:
-        date = txn["Date"]
-        daily[date]["revenue"] += txn["Quantity"] * txn["UnitPrice"]
-        daily[date]["count"] += 1
+        i = offsets.get(txn["Date"])
+        if i is None:
+            i = offsets[txn["Date"]] = ordinals[txn["Date"]] - start
+        revenue[i] += txn["Quantity"] * txn["UnitPrice"]
+        count[i] += 1
+        quantity[i] += txn["Quantity"]
+
+    cum_revenue = [0] * (days + 1)
+    cum_count = [0] * (days + 1)
+    cum_quantity = [0] * (days + 1)
+
+    for i in range(days):
+        cum_revenue[i + 1] = cum_revenue[i] + revenue[i]
+        cum_count[i + 1] = cum_count[i] + count[i]
+        cum_quantity[i + 1] = cum_quantity[i] + quantity[i]
+
+    return {
+        "start": start,
+        "end": end,
+        "days": days,
+        "offsets": offsets,
+        "revenue": revenue,
+        "transactions": count,
+        "quantity": quantity,
+        "cum_revenue": cum_revenue,
+        "cum_transactions": cum_count,
+        "cum_quantity": cum_quantity
+    }
+
+
+def _window_totals(index, lo, hi):
+    # Totals for day offsets lo..hi-1 (half-open), straight from the prefix sums
+    return {
+        "revenue": index["cum_revenue"][hi] - index["cum_revenue"][lo],
+        "transaction_count": index["cum_transactions"][hi] - index["cum_transactions"][lo],
+        "quantity": index["cum_quantity"][hi] - index["cum_quantity"][lo]
+    }
+
+
+def date_range_totals(index, start_date, end_date):
+    """
+    Totals for an inclusive date range in O(1); dates outside the
+    indexed span are clamped to it
+    Returns: dict {revenue, transaction_count, quantity}
+    """
+    if not index["days"]:
+        return {"revenue": 0, "transaction_count": 0, "quantity": 0}
+
+    lo = datetime.strptime(start_date, "%Y-%m-%d").toordinal() - index["start"]
+    hi = datetime.strptime(end_date, "%Y-%m-%d").toordinal() - index["start"] + 1
+
+    lo = min(max(lo, 0), index["days"])
+    hi = min(max(hi, lo), index["days"])
+
+    return _window_totals(index, lo, hi)
+
+
+def rolling_averages(index, window=7):
+    """
+    Trailing rolling average of daily revenue, transactions and quantity.
+    Days before a full window is available average over the days seen so far
+    Returns: dict {date: {revenue, transaction_count, quantity}}
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1 day")
 
-    peak_date, peak_data = max(
-        daily.items(),
-        key=lambda x: x[1]["revenue"]
+    result = {}
+    for i in range(index["days"]):
+        lo = max(0, i + 1 - window)
+        totals = _window_totals(index, lo, i + 1)
+        span = i + 1 - lo
+        result[_offset_to_date(index, i)] = {
+            key: round(value / span, 2) for key, value in totals.items()
+        }
+
+    return result
+
+
+def period_rollup(index, period="month"):
+    """
+    Rolls daily totals up into ISO weeks ("2024-W49") or months ("2024-12")
+    Returns: dict {period_key: {revenue, transaction_count, quantity}}
+    """
+    if period not in ("week", "month"):
+        raise ValueError(f"Unsupported period: {period}")
+
+    # Collect the [lo, hi) day offsets covered by each period, then
+    # total each one from the prefix sums
+    bounds = {}
+    for i in range(index["days"]):
+        day = date_cls.fromordinal(index["start"] + i)
+        if period == "week":
+            year, week, _ = day.isocalendar()
+            key = f"{year}-W{week:02d}"
+        else:
+            key = f"{day.year}-{day.month:02d}"
+
+        lo, _ = bounds.get(key, (i, i))
+        bounds[key] = (lo, i + 1)
+
+    return {key: _window_totals(index, lo, hi) for key, (lo, hi) in bounds.items()}
+
+
+def find_peak_sales_window(index, window=7):
+    """
+    Finds the run of `window` consecutive days with the highest revenue
+    Returns: (start_date, end_date, revenue, transaction_count)
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1 day")
+
+    if not index["days"]:
+        return None
+
+    window = min(window, index["days"])
+    best = max(
+        range(index["days"] - window + 1),
+        key=lambda lo: index["cum_revenue"][lo + window] - index["cum_revenue"][lo]
     )
+    totals = _window_totals(index, best, best + window)
 
-    return peak_date, peak_data["revenue"], peak_data["count"]
+    return (
+        _offset_to_date(index, best),
+        _offset_to_date(index, best + window - 1),
+        totals["revenue"],
+        totals["transaction_count"]
+    )
 
 
 # --------------------------------------------------
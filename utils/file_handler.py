@@ -1,5 +1,7 @@
 # utils/file_handler.py
 import os
+import math
+import hashlib
 
 
 # --------------------------------------------------
@@ -71,12 +73,70 @@ def parse_transactions(raw_lines):
     return transactions
 
 
+# --------------------------------------------------
+# Helper Function: Duplicate TransactionID Detection
+# --------------------------------------------------
+def make_duplicate_checker(mode="exact", capacity=1000, false_positive_rate=0.01):
+    """
+    Creates a seen-before check for TransactionIDs.
+    "exact" keeps every ID in a set; "bloom" uses a Bloom filter sized for
+    `capacity` IDs at `false_positive_rate`, so its size is set by `capacity`
+    alone, but a small fraction of unique IDs may be reported as duplicates.
+    Returns: function(txn_id) -> True if the ID was already seen
+    """
+    if mode == "exact":
+        seen = set()
+
+        def check(txn_id):
+            if txn_id in seen:
+                return True
+            seen.add(txn_id)
+            return False
+
+        return check
+
+    if mode != "bloom":
+        raise ValueError(f"Unsupported dedup mode: {mode}")
+    if not 0 < false_positive_rate < 1:
+        raise ValueError("false_positive_rate must be between 0 and 1")
+
+    capacity = max(capacity, 1)
+    num_bits = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    bits = bytearray((num_bits + 7) // 8)
+
+    def check(txn_id):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(txn_id.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+
+        present = True
+        for i in range(num_hashes):
+            pos = (h1 + i * h2) % num_bits
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+
+        return present
+
+    return check
+
+
 # --------------------------------------------------
 # Task 1.3: Validate and Filter Data
 # --------------------------------------------------
-def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
+def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None,
+                        dedup="exact", false_positive_rate=0.01, dedup_capacity=None):
     """
-    Validates transactions and applies optional filters
+    Validates transactions, drops repeated TransactionIDs as they are
+    validated (first one wins) and applies optional filters.
+    dedup="exact" keeps every ID seen, so its memory grows with the input.
+    dedup="bloom" uses a Bloom filter sized for `dedup_capacity` IDs
+    (defaults to the input size; set it to cap memory). In Bloom mode a
+    unique ID can be dropped as a false positive, so summary["duplicates"]
+    is an upper bound. dedup=None keeps duplicates
     Returns: (valid_transactions, invalid_count, filter_summary)
     """
     required_fields = [
@@ -88,6 +148,11 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
     invalid_count = 0
     total_input = len(transactions)
 
+    duplicate_count = 0
+    if dedup:
+        capacity = dedup_capacity if dedup_capacity is not None else total_input
+        is_duplicate = make_duplicate_checker(dedup, capacity, false_positive_rate)
+
     # ---------------- Validation ----------------
     for txn in transactions:
         if not all(field in txn for field in required_fields):
@@ -106,10 +171,20 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
             invalid_count += 1
             continue
 
+        # ---------------- Duplicate Filter ----------------
+        if dedup and is_duplicate(txn["TransactionID"]):
+            duplicate_count += 1
+            continue
+
         valid_transactions.append(txn)
 
     print(f"Total records parsed: {total_input}")
     print(f"Invalid records removed: {invalid_count}")
+    if dedup == "bloom":
+        print(f"Duplicate TransactionIDs removed (bloom, fp rate {false_positive_rate}): "
+              f"up to {duplicate_count}")
+    elif dedup:
+        print(f"Duplicate TransactionIDs removed ({dedup}): {duplicate_count}")
     print(f"Valid records after validation: {len(valid_transactions)}")
 
     # ---------------- Region Filter ----------------
@@ -151,6 +226,9 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
     summary = {
         "total_input": total_input,
         "invalid": invalid_count,
+        "duplicates": duplicate_count,
+        "dedup_mode": dedup,
+        "dedup_false_positive_rate": false_positive_rate if dedup == "bloom" else None,
         "filtered_by_region": filtered_by_region,
         "filtered_by_amount": filtered_by_amount,
         "final_count": len(valid_transactions)